@@ -1,7 +1,18 @@
-import os, glob
+import os, glob, functools
+import pandas as pd
 import geopandas as gpd
+import pyogrio
+import shapely
 from shapely.geometry import Polygon, MultiPolygon
+from shapely.strtree import STRtree
+from pyproj import Transformer
 import numpy as np
+try:
+    import pyarrow  # optional: arrow reads and the GeoParquet cache
+except ImportError:
+    pyarrow = None
+
+gpd.options.io_engine = "pyogrio"
 
 from bokeh.io import curdoc
 from bokeh.layouts import column, row, Spacer
@@ -13,7 +24,8 @@ from bokeh.models import (
 )
 from bokeh.models.widgets.tables import HTMLTemplateFormatter
 from bokeh.plotting import figure
-from bokeh.tile_providers import CARTODBPOSITRON, ESRI_IMAGERY
+from bokeh.models import WMTSTileSource, TileRenderer
+import xyzservices.providers as xyz
 
 # -----------------------------------------------------------------------------
 # 1) Read Shapefiles
@@ -22,77 +34,171 @@ old_taz_folder = "./shapefiles/old_taz_shapefile"
 new_taz_folder = "./shapefiles/new_taz_shapefile"
 blocks_folder  = "./shapefiles/blocks_shapefile"
 
+NUM_COLS = ["HH19","PERSNS19","WORKRS19","EMP19","HH49","PERSNS49","WORKRS49","EMP49"]
+
+# Only the fields used below are read; either spelling of each is accepted
+old_taz_columns = ["taz_id", "TAZ_ID"]
+new_taz_columns = ["taz_new1", "taz_id"] + [c.lower() for c in NUM_COLS] + NUM_COLS
+blocks_columns  = ["GEOID20", "BLOCK_ID"] + NUM_COLS
+
 def find_shapefile_in_folder(folder):
     shp_files = glob.glob(os.path.join(folder, "*.shp"))
     if not shp_files:
         raise FileNotFoundError(f"No shapefile found in folder: {folder}")
     return shp_files[0]
 
-url_old_taz = find_shapefile_in_folder(old_taz_folder)
-url_new_taz = find_shapefile_in_folder(new_taz_folder)
-url_blocks  = find_shapefile_in_folder(blocks_folder)
-
-gdf_old_taz  = gpd.read_file(url_old_taz)
-gdf_new_taz  = gpd.read_file(url_new_taz)
-gdf_blocks   = gpd.read_file(url_blocks)
+def load_layer(folder, columns):
+    """
+    Read the given columns of the shapefile in a folder, caching them as
+    GeoParquet alongside. Later startups read the cache instead, until any
+    of the shapefile's component files is newer than it or the wanted
+    columns change.
+    """
+    url = find_shapefile_in_folder(folder)
+    fields = set(pyogrio.read_info(url)["fields"])
+    columns = [c for c in columns if c in fields]
+
+    cache = os.path.join(folder, "_cache.parquet")
+    shp_mtime = max(os.path.getmtime(f) for f in glob.glob(os.path.splitext(url)[0] + ".*"))
+    if pyarrow is not None and os.path.exists(cache) and os.path.getmtime(cache) >= shp_mtime:
+        try:
+            gdf = gpd.read_parquet(cache)
+        except (OSError, ValueError):
+            gdf = None  # unreadable cache: rebuild it from the shapefile
+        if gdf is not None and set(gdf.columns) - {gdf.geometry.name} == set(columns):
+            return gdf
+
+    # pyogrio + arrow reads the whole layer in bulk instead of feature by feature
+    gdf = gpd.read_file(url, use_arrow=pyarrow is not None, columns=columns)
+    if pyarrow is not None:
+        # Write beside the cache and swap it in, so an interrupted write
+        # never leaves a truncated cache behind
+        tmp = f"{cache}.{os.getpid()}.tmp"
+        try:
+            gdf.to_parquet(tmp)
+            os.replace(tmp, cache)
+        except OSError:
+            # read-only share: just skip the cache
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return gdf
+
+gdf_old_taz  = load_layer(old_taz_folder, old_taz_columns)
+gdf_new_taz  = load_layer(new_taz_folder, new_taz_columns)
+gdf_blocks   = load_layer(blocks_folder,  blocks_columns)
 
 def remove_zero_geoms(gdf):
-    def is_zero_bbox(geom):
-        if geom is None or geom.is_empty:
-            return True
-        minx, miny, maxx, maxy = geom.bounds
-        return (minx == 0 and miny == 0 and maxx == 0 and maxy == 0)
-    return gdf[~gdf.geometry.apply(is_zero_bbox)].copy()
+    # Vectorized: one shapely bounds call over the raw geometry array
+    geoms = gdf.geometry.values
+    b = shapely.bounds(geoms)
+    zero_bbox = (b == 0).all(axis=1)
+    mask = ~zero_bbox & ~shapely.is_missing(geoms) & ~shapely.is_empty(geoms)
+    if mask.all():
+        return gdf
+    return gdf[mask].copy()
 
 gdf_old_taz  = remove_zero_geoms(gdf_old_taz)
 gdf_new_taz  = remove_zero_geoms(gdf_new_taz)
 gdf_blocks   = remove_zero_geoms(gdf_blocks)
 
 # Convert to EPSG:3857 if needed
-if gdf_old_taz.crs is None or gdf_old_taz.crs.to_string() != "EPSG:3857":
-    gdf_old_taz = gdf_old_taz.to_crs(epsg=3857)
-if gdf_new_taz.crs is None or gdf_new_taz.crs.to_string() != "EPSG:3857":
-    gdf_new_taz = gdf_new_taz.to_crs(epsg=3857)
-if gdf_blocks.crs is None or gdf_blocks.crs.to_string() != "EPSG:3857":
-    gdf_blocks = gdf_blocks.to_crs(epsg=3857)
-
-# Rename columns if needed
-if 'taz_id' not in gdf_old_taz.columns:
-    if 'TAZ_ID' in gdf_old_taz.columns:
-        gdf_old_taz = gdf_old_taz.rename(columns={'TAZ_ID': 'taz_id'})
-
-rename_map_new = {}
-if 'taz_new1' in gdf_new_taz.columns:
-    rename_map_new['taz_new1'] = 'taz_id'
-if 'hh19' in gdf_new_taz.columns:
-    rename_map_new['hh19'] = 'HH19'
-if 'persns19' in gdf_new_taz.columns:
-    rename_map_new['persns19'] = 'PERSNS19'
-if 'workrs19' in gdf_new_taz.columns:
-    rename_map_new['workrs19'] = 'WORKRS19'
-if 'emp19' in gdf_new_taz.columns:
-    rename_map_new['emp19']  = 'EMP19'
-if 'hh49' in gdf_new_taz.columns:
-    rename_map_new['hh49'] = 'HH49'
-if 'persns49' in gdf_new_taz.columns:
-    rename_map_new['persns49'] = 'PERSNS49'
-if 'workrs49' in gdf_new_taz.columns:
-    rename_map_new['workrs49'] = 'WORKRS49'
-if 'emp49' in gdf_new_taz.columns:
-    rename_map_new['emp49']  = 'EMP49'
-if rename_map_new:
-    gdf_new_taz = gdf_new_taz.rename(columns=rename_map_new)
-
-if 'GEOID20' in gdf_blocks.columns:
-    gdf_blocks = gdf_blocks.rename(columns={'GEOID20': 'BLOCK_ID'})
+def to_web_mercator(gdf):
+    """
+    Reproject a layer to EPSG:3857 with one pyproj call over the flat
+    coordinate arrays of all its geometries.
+    """
+    if gdf.crs is not None and gdf.crs.to_string() == "EPSG:3857":
+        return gdf
+    if gdf.crs is None:
+        raise ValueError("Cannot transform naive geometries. Please set a crs on the shapefile.")
+    transformer = Transformer.from_crs(gdf.crs, "EPSG:3857", always_xy=True)
+    geoms = shapely.transform(np.asarray(gdf.geometry.values), transformer.transform,
+                              interleaved=False)
+    return gdf.set_geometry(gpd.GeoSeries(geoms, index=gdf.index, crs="EPSG:3857"))
+
+gdf_old_taz = to_web_mercator(gdf_old_taz)
+gdf_new_taz = to_web_mercator(gdf_new_taz)
+gdf_blocks  = to_web_mercator(gdf_blocks)
+
+# Simplify outlines for display (tolerance in EPSG:3857 metres); vertices
+# closer than this collapse to the same pixel at the zooms the app uses.
+def simplify_for_display(gdf, tolerance):
+    geoms = np.asarray(gdf.geometry.values)
+    simple = shapely.simplify(geoms, tolerance, preserve_topology=False)
+    # Keep the original shape wherever simplifying would collapse a polygon
+    # or drop/merge parts (small islands, or GEOS cleaning up invalid input)
+    keep = (shapely.is_empty(simple) | ~shapely.is_valid(geoms) |
+            (shapely.get_num_geometries(simple) != shapely.get_num_geometries(geoms)))
+    simple = np.where(keep, geoms, simple)
+    return gdf.set_geometry(gpd.GeoSeries(simple, index=gdf.index, crs=gdf.crs))
+
+gdf_old_taz = simplify_for_display(gdf_old_taz, 2.0)
+gdf_new_taz = simplify_for_display(gdf_new_taz, 2.0)
+gdf_blocks  = simplify_for_display(gdf_blocks,  5.0)
+
+# Rename columns to the canonical names used below, where present
+RENAME_OLD_TAZ = {'TAZ_ID': 'taz_id'}
+RENAME_NEW_TAZ = {'taz_new1': 'taz_id', **{c.lower(): c for c in NUM_COLS}}
+RENAME_BLOCKS  = {'GEOID20': 'BLOCK_ID'}
+
+def rename_present(gdf, mapping):
+    return gdf.rename(columns={k: v for k, v in mapping.items()
+                               if k in gdf.columns and v not in gdf.columns})
+
+gdf_old_taz = rename_present(gdf_old_taz, RENAME_OLD_TAZ)
+gdf_new_taz = rename_present(gdf_new_taz, RENAME_NEW_TAZ)
+gdf_blocks  = rename_present(gdf_blocks,  RENAME_BLOCKS)
+
+# Coerce the numeric attributes once at load so the search path only
+# gathers them. Kept as float64: the tables show raw values, and float32
+# would turn 1109.3 into 1109.300048828125. Missing columns are left to
+# precompute_parts, which fills them with None (blank table cells).
+for layer in (gdf_new_taz, gdf_blocks):
+    for c in NUM_COLS:
+        if c in layer.columns:
+            layer[c] = pd.to_numeric(layer[c], errors="coerce")
+
+# One spatial index over all three layers, built once, so a search is a
+# single tree traversal. tree_layer / tree_row map each tree entry back to
+# its layer and its row position within that layer.
+LAYER_OLD_TAZ, LAYER_NEW_TAZ, LAYER_BLOCKS = 0, 1, 2
+_layers = [gdf_old_taz, gdf_new_taz, gdf_blocks]
+tree_all   = STRtree(np.concatenate([np.asarray(g.geometry.values) for g in _layers]))
+tree_layer = np.repeat(np.arange(len(_layers)), [len(g) for g in _layers])
+tree_row   = np.concatenate([np.arange(len(g)) for g in _layers])
 
 # -----------------------------------------------------------------------------
 # 2) Helper Functions
 # -----------------------------------------------------------------------------
-def split_multipolygons_to_cds(gdf, id_field, ensure_cols=None):
+def explode_polygon_parts(gdf):
+    """
+    Return the single-polygon parts of every row and, for each part,
+    the position of the row it came from.
     """
-    Break multi-polygons into single polygon ring coordinate lists
-    for Bokeh's patches glyph.
+    geoms = np.asarray(gdf.geometry.values)
+    type_ids = shapely.get_type_id(geoms)
+    # Polygons (type 3) are already single parts; only MultiPolygons (6) and
+    # GeometryCollections (7) go through get_parts.
+    poly_rows = np.flatnonzero(type_ids == 3)
+    multi_rows = np.flatnonzero((type_ids == 6) | (type_ids == 7))
+    sub, sub_idx = shapely.get_parts(geoms[multi_rows], return_index=True)
+    keep = shapely.get_type_id(sub) == 3
+    parts = np.concatenate([geoms[poly_rows], sub[keep]])
+    row_idx = np.concatenate([poly_rows, multi_rows[sub_idx[keep]]])
+    # Back into source row order, parts of a row kept in sequence
+    order = np.argsort(row_idx, kind="stable")
+    return parts[order], row_idx[order]
+
+def _split_rings(values, splits, n):
+    # Object array holding one ring view per part, so a search can gather
+    # rings with a single fancy index instead of a Python loop
+    return np.fromiter(np.split(values, splits) if n else [], dtype=object, count=n)
+
+def precompute_parts(gdf, id_field, ensure_cols=None):
+    """
+    Explode a layer once into per-part exterior ring coordinates, ids,
+    attributes and label centroids. Searches only gather from the result
+    by source row position, so no geometry is touched on the search path.
     """
     if ensure_cols is None:
         ensure_cols = []
@@ -100,59 +206,71 @@ def split_multipolygons_to_cds(gdf, id_field, ensure_cols=None):
         if c not in gdf.columns:
             gdf[c] = None
 
-    all_xs, all_ys, all_ids = [], [], []
-    attr_data = {c: [] for c in ensure_cols}
-
-    for _, row in gdf.iterrows():
-        geom = row.geometry
-        if geom is None or geom.is_empty:
-            continue
-        row_id = str(row[id_field])
-        row_attrs = {c: row[c] for c in ensure_cols}
-
-        if geom.geom_type == "MultiPolygon":
-            for subpoly in geom.geoms:
-                xs, ys = subpoly.exterior.coords.xy
-                all_xs.append(xs.tolist())
-                all_ys.append(ys.tolist())
-                all_ids.append(row_id)
-                for c in ensure_cols:
-                    attr_data[c].append(row_attrs[c])
-        elif geom.geom_type == "Polygon":
-            xs, ys = geom.exterior.coords.xy
-            all_xs.append(xs.tolist())
-            all_ys.append(ys.tolist())
-            all_ids.append(row_id)
-            for c in ensure_cols:
-                attr_data[c].append(row_attrs[c])
-
-    data = {'xs': all_xs, 'ys': all_ys, 'id': all_ids}
-    for c in ensure_cols:
-        data[c] = attr_data[c]
-    return ColumnDataSource(data)
+    parts, row_idx = explode_polygon_parts(gdf)
+    # Pull all exterior ring coordinates out in one shapely call, then
+    # split them back into one ring per part.
+    rings = shapely.get_exterior_ring(parts)
+    coords, ring_idx = shapely.get_coordinates(rings, return_index=True)
+    splits = np.cumsum(np.bincount(ring_idx, minlength=len(rings)))[:-1]
+    centroids = shapely.centroid(parts)
+    # float32 is ample for web mercator metres at display zoom, and Bokeh
+    # ships numeric arrays as binary buffers rather than JSON lists
+    xs = np.ascontiguousarray(coords[:, 0], dtype=np.float32)
+    ys = np.ascontiguousarray(coords[:, 1], dtype=np.float32)
+
+    return {
+        "xs": _split_rings(xs, splits, len(rings)),
+        "ys": _split_rings(ys, splits, len(rings)),
+        "id": gdf[id_field].astype(str).values[row_idx],
+        # parts of source row r are offsets[r]:offsets[r + 1] (row_idx is sorted)
+        "offsets": np.searchsorted(row_idx, np.arange(len(gdf) + 1)),
+        "attrs": {c: gdf[c].values[row_idx] for c in ensure_cols},
+        "cx": shapely.get_x(centroids).astype(np.float32),
+        "cy": shapely.get_y(centroids).astype(np.float32),
+    }
 
-def split_multipolygons_to_text(gdf, id_field):
+def _gather_parts(parts, sel, attrs=True):
+    data = {'xs': parts["xs"][sel].tolist(),
+            'ys': parts["ys"][sel].tolist(),
+            'id': parts["id"][sel].tolist()}
+    if attrs:
+        for c, values in parts["attrs"].items():
+            data[c] = values[sel].tolist()
+    return data
+
+def part_positions(parts, rows):
     """
-    Return centroid coordinates for each (multi)polygon for text labeling.
+    Positions in `parts` of every polygon part of the given source rows,
+    in the order the rows are given.
     """
-    all_cx, all_cy, all_ids = [], [], []
-    for _, row in gdf.iterrows():
-        geom = row.geometry
-        if geom is None or geom.is_empty:
-            continue
-        row_id = str(row[id_field])
-        if geom.geom_type == "MultiPolygon":
-            for subpoly in geom.geoms:
-                centroid = subpoly.centroid
-                all_cx.append(centroid.x)
-                all_cy.append(centroid.y)
-                all_ids.append(row_id)
-        elif geom.geom_type == "Polygon":
-            centroid = geom.centroid
-            all_cx.append(centroid.x)
-            all_cy.append(centroid.y)
-            all_ids.append(row_id)
-    return {"cx": all_cx, "cy": all_cy, "id": all_ids}
+    rows = np.asarray(rows, dtype=np.intp)
+    starts = parts["offsets"][rows]
+    counts = parts["offsets"][rows + 1] - starts
+    # Ragged arange: counts[k] consecutive positions from starts[k], for each k
+    return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+def parts_to_cds(parts, rows, attrs=True):
+    """
+    Collect the precomputed polygon parts of the given source rows
+    into a data dict for a patches ColumnDataSource. With attrs=False
+    only the outline columns (xs/ys/id) are returned.
+    """
+    sel = part_positions(parts, np.sort(rows))
+    return _gather_parts(parts, sel, attrs)
+
+def _gather_text(parts, sel):
+    # Label coordinates stay float32 arrays (sent as binary buffers)
+    return {"cx": parts["cx"][sel],
+            "cy": parts["cy"][sel],
+            "id": parts["id"][sel].tolist()}
+
+def parts_to_cds_and_text(parts, rows):
+    """
+    Same as parts_to_cds, plus centroid coordinates of each polygon
+    part for text labeling.
+    """
+    sel = part_positions(parts, np.sort(rows))
+    return _gather_parts(parts, sel), _gather_text(parts, sel)
 
 def add_sum_row(d, colnames):
     """
@@ -162,47 +280,129 @@ def add_sum_row(d, colnames):
         d['id'] = []
         for c in colnames:
             d[c] = []
-    sums = {c: 0 for c in colnames}
-    for c in colnames:
-        for val in d[c]:
-            if isinstance(val, (int, float)):
-                sums[c] += val
+    # Non-numeric entries coerce to NaN and are skipped by the sum
+    mat = np.column_stack([
+        pd.to_numeric(pd.Series(d[c], dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+        for c in colnames
+    ])
+    sums = np.nansum(mat, axis=0)
     d['id'].append("Sum")
-    for c in colnames:
-        d[c].append(sums[c])
+    for j, c in enumerate(colnames):
+        d[c].append(float(sums[j]))
     return d
 
-def add_formatted_fields(source, fields):
+def add_formatted_fields(data, fields):
     """
     Add *_fmt columns for nicer display in hover tooltips.
     """
     for field in fields:
         fmt_field = field + "_fmt"
-        if field in source.data:
-            source.data[fmt_field] = [
-                f"{x:.1f}" if isinstance(x, (int, float)) else ""
-                for x in source.data[field]
-            ]
+        if field in data:
+            vals = pd.to_numeric(pd.Series(data[field], dtype=object),
+                                 errors="coerce").to_numpy(dtype=np.float64)
+            data[fmt_field] = np.where(np.isnan(vals), "",
+                                       np.char.mod("%.1f", vals)).tolist()
+
+def hold_document(fn):
+    """
+    Run fn with the document on hold so all the model changes it makes
+    are sent to the browser as one batch instead of one message each.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        doc = curdoc()
+        if doc.callbacks.hold_value is not None:
+            return fn(*args, **kwargs)  # already inside a held update
+        doc.hold()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            doc.unhold()
+    return wrapper
+
+# Exploded polygon parts of each layer, built once at startup
+parts_old_taz = precompute_parts(gdf_old_taz, "taz_id")
+parts_new_taz = precompute_parts(gdf_new_taz, "taz_id", NUM_COLS)
+parts_blocks  = precompute_parts(gdf_blocks, "BLOCK_ID", NUM_COLS)
+
+# Hash index over old TAZ ids: id -> row position(s) in gdf_old_taz
+old_taz_id_index = pd.Index(gdf_old_taz['taz_id'].values)
+
+def bbox_arrays(gdf):
+    """
+    Per-geometry bounding boxes as four contiguous float32 arrays
+    (minx, miny, maxx, maxy), rounded outwards so each box still
+    covers its geometry.
+    """
+    b = shapely.bounds(gdf.geometry.values)
+    lo = np.nextafter(b[:, :2].astype(np.float32), np.float32(-np.inf))
+    hi = np.nextafter(b[:, 2:].astype(np.float32), np.float32(np.inf))
+    return lo[:, 0].copy(), lo[:, 1].copy(), hi[:, 0].copy(), hi[:, 1].copy()
+
+old_taz_bbox = bbox_arrays(gdf_old_taz)
+# Exact float64 boxes for the zoom extent; the outward-rounded float32
+# ones above would hide a zero-width TAZ from the degenerate check
+old_taz_bounds = shapely.bounds(gdf_old_taz.geometry.values)
+
+def filter_old_taz(old_id_int, radius):
+    """
+    Locate an old TAZ and everything within `radius` metres of its centroid.
+
+    Returns None if the id is unknown, else (old_rows, centroid, buffer_geom,
+    idx_old, idx_new, idx_blocks) where old_rows are the TAZ's own rows and
+    the idx_* arrays are row positions in gdf_old_taz / gdf_new_taz /
+    gdf_blocks.
+    """
+    old_rows = old_taz_id_index.get_indexer_for([old_id_int])
+    if len(old_rows) == 0 or old_rows[0] < 0:
+        return None
+    geoms = gdf_old_taz.geometry.values[old_rows]
+    if len(geoms) == 1:
+        centroid = geoms[0].centroid
+    else:
+        # Area-weighted centroid of the rows; avoids a full polygon union
+        xy = shapely.get_coordinates(shapely.centroid(geoms))
+        w = shapely.area(geoms)
+        centroid = shapely.Point(*(w @ xy / w.sum()))
+    buffer_geom = centroid.buffer(radius)
+
+    # The tree only tests envelopes, so query with the buffer's bounding
+    # square; the disc itself is kept for display and the exact test below.
+    query_box = shapely.box(centroid.x - radius, centroid.y - radius,
+                            centroid.x + radius, centroid.y + radius)
+    hits = tree_all.query(query_box)
+    hit_layer = tree_layer[hits]
+    # Exact test only for the old TAZ neighbours; the new TAZ and block
+    # layers are display-only, so the tree's bounding-box hits are enough.
+    old_hits = hits[hit_layer == LAYER_OLD_TAZ]
+    rows = tree_row[old_hits]
+    # A box inside the square inscribed in the buffer disc is a certain hit,
+    # so only the remaining candidates go through shapely.intersects.
+    h = radius / np.sqrt(2)
+    minx, miny, maxx, maxy = old_taz_bbox
+    inside = ((minx[rows] >= centroid.x - h) & (maxx[rows] <= centroid.x + h) &
+              (miny[rows] >= centroid.y - h) & (maxy[rows] <= centroid.y + h))
+    exact = ~inside
+    shapely.prepare(buffer_geom)
+    exact[exact] = shapely.intersects(tree_all.geometries[old_hits[exact]], buffer_geom)
+    idx_old    = rows[inside | exact]
+    idx_new    = tree_row[hits[hit_layer == LAYER_NEW_TAZ]]
+    idx_blocks = tree_row[hits[hit_layer == LAYER_BLOCKS]]
+    return old_rows, centroid, buffer_geom, idx_old, idx_new, idx_blocks
 
 # -----------------------------------------------------------------------------
 # 3) DataSources
 # -----------------------------------------------------------------------------
 old_taz_source        = ColumnDataSource(dict(xs=[], ys=[], id=[]))
-old_taz_blocks_source = ColumnDataSource(dict(xs=[], ys=[], id=[]))
 new_taz_source        = ColumnDataSource(dict(xs=[], ys=[], id=[],
                                               HH19=[], PERSNS19=[], WORKRS19=[], EMP19=[],
                                               HH49=[], PERSNS49=[], WORKRS49=[], EMP49=[]))
-new_taz_blocks_source = ColumnDataSource(dict(xs=[], ys=[], id=[]))
+# Faint block outlines, shared by the old and new TAZ panels
+blocks_outline_source = ColumnDataSource(dict(xs=[], ys=[], id=[]))
 blocks_source         = ColumnDataSource(dict(xs=[], ys=[], id=[],
                                               HH19=[], PERSNS19=[], WORKRS19=[], EMP19=[],
                                               HH49=[], PERSNS49=[], WORKRS49=[], EMP49=[]))
 
-combined_old_source    = ColumnDataSource(dict(xs=[], ys=[], id=[]))
-combined_new_source    = ColumnDataSource(dict(xs=[], ys=[], id=[],
-                                               HH19=[], PERSNS19=[], WORKRS19=[], EMP19=[],
-                                               HH49=[], PERSNS49=[], WORKRS49=[], EMP49=[]))
-combined_blocks_source = ColumnDataSource(dict(xs=[], ys=[], id=[]))
-
 old_taz_buffer_source    = ColumnDataSource(dict(xs=[], ys=[], id=[]))
 old_taz_neighbors_source = ColumnDataSource(dict(xs=[], ys=[], id=[]))
 extra_old_taz_source     = ColumnDataSource(dict(xs=[], ys=[], id=[]))
@@ -261,10 +461,28 @@ div_blocks_title   = Div(text="<b>4) Blocks (selectable, yellow)</b>", styles={'
 # -----------------------------------------------------------------------------
 # 5) Add Base Tiles
 # -----------------------------------------------------------------------------
+def make_tile_source(provider):
+    return WMTSTileSource(
+        url=provider.build_url(),
+        attribution=provider.html_attribution,
+        min_zoom=provider.get("min_zoom", 0),
+        max_zoom=provider.get("max_zoom", 30),
+    )
+
+# Built once and shared by all four figures, so switching background
+# only swaps renderers.
+tile_sources = {
+    "CartoDB Positron": make_tile_source(xyz.CartoDB.Positron),
+    "ESRI Satellite":   make_tile_source(xyz.Esri.WorldImagery),
+}
+
 tile_map = {}
-for f in [p_old, p_new, p_combined, p_blocks]:
-    t = f.add_tile(CARTODBPOSITRON)
-    tile_map[f] = t
+def add_tiles():
+    for f in [p_old, p_new, p_combined, p_blocks]:
+        tile_map[f] = f.add_tile(tile_sources["CartoDB Positron"])
+
+# Let the patches and layout render first; tiles follow a tick later
+curdoc().add_next_tick_callback(add_tiles)
 
 # Grab references to each figure’s ResetTool (not used anymore)
 p_old_reset, p_new_reset, p_comb_reset, p_blocks_reset = None, None, None, None
@@ -292,7 +510,7 @@ renderer_old_taz = p_old.patches(
 )
 # Make block boundaries very faint (non-selectable) in top left
 p_old.patches(
-    xs="xs", ys="ys", source=old_taz_blocks_source,
+    xs="xs", ys="ys", source=blocks_outline_source,
     fill_color=None, line_color="black", line_width=2, line_dash='dotted',
     line_alpha=0.25
 )
@@ -342,7 +560,7 @@ if taptool:
 
 # Make block boundaries very faint (non-selectable) in top right
 p_new.patches(
-    xs="xs", ys="ys", source=new_taz_blocks_source,
+    xs="xs", ys="ys", source=blocks_outline_source,
     fill_color=None, line_color="black", line_width=2, line_dash='dotted',
     line_alpha=0.25
 )
@@ -358,20 +576,23 @@ p_new.add_tools(HoverTool(
     renderers=[taz_glyph_new]
 ))
 
-# Combined (bottom‐left)
+# Combined (bottom‐left): reuses the top/right panels' sources. Selections
+# made in the right-hand panels must not fade these outlines.
 p_combined.patches(
-    xs="xs", ys="ys", source=combined_new_source,
-    fill_color=None, line_color="red", line_width=2
+    xs="xs", ys="ys", source=new_taz_source,
+    fill_color=None, line_color="red", line_width=2,
+    nonselection_line_alpha=1.0
 )
 # Thicken the green old TAZ boundaries so they are easier to see:
 p_combined.patches(
-    xs="xs", ys="ys", source=combined_old_source,
+    xs="xs", ys="ys", source=old_taz_source,
     fill_color=None, line_color="green", line_width=3
 )
 p_combined.patches(
-    xs="xs", ys="ys", source=combined_blocks_source,
+    xs="xs", ys="ys", source=blocks_source,
     fill_color="yellow", fill_alpha=0.15,
-    line_color="black", line_width=2, line_dash='dotted'
+    line_color="black", line_width=2, line_dash='dotted',
+    nonselection_fill_alpha=0.15, nonselection_line_alpha=1.0
 )
 p_combined.patches(
     xs="xs", ys="ys", source=extra_old_taz_source,
@@ -476,8 +697,8 @@ def add_sum_to_new_taz_table():
     if inds:
         for c in d.keys():
             if c in new_taz_source.data:
-                d[c] = [new_taz_source.data[c][i] for i in inds]
-    d = add_sum_row(d, ["HH19","PERSNS19","WORKRS19","EMP19","HH49","PERSNS49","WORKRS49","EMP49"])
+                d[c] = np.asarray(new_taz_source.data[c], dtype=object)[inds].tolist()
+    d = add_sum_row(d, NUM_COLS)
     new_taz_table_source.data = d
 
 def add_sum_to_blocks_table():
@@ -488,8 +709,8 @@ def add_sum_to_blocks_table():
     }
     if inds:
         for c in d.keys():
-            d[c] = [blocks_source.data[c][i] for i in inds]
-    d = add_sum_row(d, ["HH19","PERSNS19","WORKRS19","EMP19","HH49","PERSNS49","WORKRS49","EMP49"])
+            d[c] = np.asarray(blocks_source.data[c], dtype=object)[inds].tolist()
+    d = add_sum_row(d, NUM_COLS)
     blocks_table_source.data = d
 
 # Whenever a selection changes in top‐right (new TAZ) or bottom‐right (blocks), update tables
@@ -566,6 +787,7 @@ open_gmaps_button.js_on_click(CustomJS(args=dict(centroid_source=centroid_source
 match_zoom_btn = Button(label="Match 1st Panel Zoom", button_type="primary", width=130)
 # Removed the Reset Views button and its callback
 
+@hold_document
 def on_match_zoom_click():
     # Copy p_old's range to the other three
     p_new.x_range.start      = p_old.x_range.start
@@ -597,6 +819,55 @@ row2 = row(
 # -----------------------------------------------------------------------------
 # 10) Searching Logic
 # -----------------------------------------------------------------------------
+@functools.lru_cache(maxsize=256)
+def search_payload(old_id_int, radius):
+    """
+    Build the data dicts for every source a search updates, or None if
+    the id is unknown. Everything it reads is fixed after startup, so
+    results are cached and a repeat search skips the spatial query and
+    the gathers. Callers must not mutate the returned dicts.
+    """
+    found = filter_old_taz(old_id_int, radius)
+    if found is None:
+        return None
+    old_rows, centroid, buffer_geom, idx_old, idx_new, idx_blocks = found
+
+    # Buffer outline
+    if (not buffer_geom.is_empty) and buffer_geom.geom_type == "Polygon":
+        bx, by = buffer_geom.exterior.coords.xy
+        buffer_data = {"xs": [np.asarray(bx, dtype=np.float32)],
+                       "ys": [np.asarray(by, dtype=np.float32)],
+                       "id": [str(old_id_int)]}
+    else:
+        buffer_data = {"xs": [], "ys": [], "id": []}
+
+    old_temp, old_text = parts_to_cds_and_text(parts_old_taz, old_rows)
+    new_temp, new_text = parts_to_cds_and_text(parts_new_taz, idx_new)
+    blocks_temp = parts_to_cds(parts_blocks, idx_blocks)
+
+    add_formatted_fields(new_temp,    ["HH19","EMP19","HH49","EMP49"])
+    add_formatted_fields(blocks_temp, ["HH19","EMP19","HH49","EMP49"])
+
+    # Top-right TAZ IDs all start red
+    new_text['color'] = ["red"] * len(new_text['id'])
+
+    return {
+        "centroid": {"cx": [centroid.x], "cy": [centroid.y]},
+        "buffer": buffer_data,
+        "neighbors": parts_to_cds(parts_old_taz, idx_old),
+        "old": old_temp,
+        "old_text": old_text,
+        "new": new_temp,
+        "new_text": new_text,
+        "blocks": blocks_temp,
+        # The faint block outline layers show the block shapes only
+        "blocks_outline": {k: blocks_temp[k] for k in ("xs", "ys", "id")},
+        # Zoom extent from the cached float64 boxes of the matched rows
+        "bounds": (*old_taz_bounds[old_rows, :2].min(axis=0).tolist(),
+                   *old_taz_bounds[old_rows, 2:].max(axis=0).tolist()),
+    }
+
+@hold_document
 def run_search():
     val = text_input.value.strip()
     if not val:
@@ -618,75 +889,30 @@ def run_search():
         radius = 1000
         radius_input.value = "1000"
 
-    subset_old = gdf_old_taz[gdf_old_taz['taz_id'] == old_id_int]
-    if subset_old.empty:
+    payload = search_payload(old_id_int, radius)
+    if payload is None:
         search_label.text = "<b>Currently Searching TAZ: <span style='color:red'>[Not Found]</span></b>"
         return
 
     search_label.text = f"<b>Currently Searching TAZ: <span style='color:green'>{old_id_int}</span></b>"
-    old_union = subset_old.unary_union
-    centroid = old_union.centroid
-    centroid_source.data = {"cx": [centroid.x], "cy": [centroid.y]}
-
-    # Build buffer
-    buffer_geom = centroid.buffer(radius)
-    if (not buffer_geom.is_empty) and buffer_geom.geom_type == "Polygon":
-        bx, by = buffer_geom.exterior.coords.xy
-        old_taz_buffer_source.data = {"xs": [list(bx)], "ys": [list(by)], "id": [str(old_id_int)]}
-    else:
-        old_taz_buffer_source.data = {"xs": [], "ys": [], "id": []}
-
-    neighbors = gdf_old_taz[gdf_old_taz.intersects(buffer_geom)].copy()
-    neighbors_temp = split_multipolygons_to_cds(neighbors, "taz_id")
-    old_taz_neighbors_source.data = dict(neighbors_temp.data)
-
-    new_sub    = gdf_new_taz[gdf_new_taz.intersects(buffer_geom)].copy()
-    blocks_sub = gdf_blocks[gdf_blocks.intersects(buffer_geom)].copy()
-
-    old_temp  = split_multipolygons_to_cds(subset_old, "taz_id")
-    new_temp  = split_multipolygons_to_cds(new_sub, "taz_id",
-                                           ["HH19","PERSNS19","WORKRS19","EMP19",
-                                            "HH49","PERSNS49","WORKRS49","EMP49"])
-    blocks_temp = split_multipolygons_to_cds(blocks_sub, "BLOCK_ID",
-                                             ["HH19","PERSNS19","WORKRS19","EMP19",
-                                              "HH49","PERSNS49","WORKRS49","EMP49"])
-    old_blk_temp = split_multipolygons_to_cds(blocks_sub, "BLOCK_ID")
-    new_blk_temp = split_multipolygons_to_cds(blocks_sub, "BLOCK_ID")
-
-    comb_old_temp = old_temp
-    comb_new_temp = new_temp
-    comb_blk_temp = split_multipolygons_to_cds(blocks_sub, "BLOCK_ID")
-
-    add_formatted_fields(new_temp,    ["HH19","EMP19","HH49","EMP49"])
-    add_formatted_fields(blocks_temp, ["HH19","EMP19","HH49","EMP49"])
-
-    old_taz_source.data          = dict(old_temp.data)
-    new_taz_source.data          = dict(new_temp.data)
-    blocks_source.data           = dict(blocks_temp.data)
-    old_taz_blocks_source.data   = dict(old_blk_temp.data)
-    new_taz_blocks_source.data   = dict(new_blk_temp.data)
-    combined_old_source.data     = dict(comb_old_temp.data)
-    combined_new_source.data     = dict(comb_new_temp.data)
-    combined_blocks_source.data  = dict(comb_blk_temp.data)
-
-    # Label coords
-    old_taz_text_source.data = split_multipolygons_to_text(subset_old, "taz_id")
-    new_taz_text_source.data = split_multipolygons_to_text(new_sub, "taz_id")
-    # Initialize text color for top-right TAZ IDs (all start red)
-    default_colors = ["red"] * len(new_taz_text_source.data['id'])
-    new_taz_text_source.data['color'] = default_colors
-
+    centroid_source.data          = payload["centroid"]
+    old_taz_buffer_source.data    = payload["buffer"]
+    old_taz_neighbors_source.data = payload["neighbors"]
+    old_taz_source.data           = payload["old"]
+    new_taz_source.data           = payload["new"]
+    blocks_source.data            = payload["blocks"]
+    blocks_outline_source.data    = payload["blocks_outline"]
+    old_taz_text_source.data      = payload["old_text"]
+    new_taz_text_source.data      = payload["new_text"]
 
     # Clear selections + tables
     new_taz_source.selected.indices = []
     blocks_source.selected.indices  = []
-    new_taz_table_source.data = {}
-    blocks_table_source.data  = {}
     add_sum_to_new_taz_table()
     add_sum_to_blocks_table()
 
     # Zoom
-    minx, miny, maxx, maxy = subset_old.total_bounds
+    minx, miny, maxx, maxy = payload["bounds"]
     if minx == maxx or miny == maxy:
         minx -= 1000; maxx += 1000
         miny -= 1000; maxy += 1000
@@ -713,21 +939,20 @@ def on_text_input_change(attr, old, new):
 text_input.on_change("value", on_text_input_change)
 apply_radius_button.on_click(run_search)
 
+@hold_document
 def on_tile_select_change(attr, old, new):
-    if new == "CartoDB Positron":
-        provider = CARTODBPOSITRON
-    else:
-        provider = ESRI_IMAGERY
+    provider = tile_sources.get(new, tile_sources["CartoDB Positron"])
 
     for fig in [p_old, p_new, p_combined, p_blocks]:
+        # Swap the tile layer with a single renderers assignment per figure
         old_tile = tile_map.get(fig)
-        if old_tile in fig.renderers:
-            fig.renderers.remove(old_tile)
-        new_tile = fig.add_tile(provider)
+        new_tile = TileRenderer(tile_source=provider)
+        fig.renderers = [new_tile] + [r for r in fig.renderers if r is not old_tile]
         tile_map[fig] = new_tile
 
 tile_select.on_change("value", on_tile_select_change)
 
+@hold_document
 def run_extra_search():
     val = extra_taz_input.value.strip()
     if not val:
@@ -741,16 +966,16 @@ def run_extra_search():
         extra_old_taz_text_source.data = {"cx": [], "cy": [], "id": []}
         return
 
-    subset_extra = gdf_old_taz[gdf_old_taz['taz_id'].isin(id_list)]
-    if subset_extra.empty:
+    rows = old_taz_id_index.get_indexer_for(list(dict.fromkeys(id_list)))
+    rows = rows[rows >= 0]
+    if len(rows) == 0:
         extra_old_taz_source.data = {"xs": [], "ys": [], "id": []}
         extra_old_taz_text_source.data = {"cx": [], "cy": [], "id": []}
         return
 
-    extra_cdsrc = split_multipolygons_to_cds(subset_extra, "taz_id")
-    extra_old_taz_source.data = dict(extra_cdsrc.data)
-    extra_text_data = split_multipolygons_to_text(subset_extra, "taz_id")
-    extra_old_taz_text_source.data = extra_text_data
+    sel = part_positions(parts_old_taz, rows)
+    extra_old_taz_source.data = _gather_parts(parts_old_taz, sel)
+    extra_old_taz_text_source.data = _gather_text(parts_old_taz, sel)
 
 extra_search_button.on_click(run_extra_search)
 extra_taz_input.on_event("value_submit", lambda event: run_extra_search())